@@ -1,9 +1,14 @@
-from threading import Thread
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from flask import Blueprint, request, jsonify, Response
 from services.mailchimp_service import MailchimpService  
 from services.wordpress_service import WordPressService  
 from processors.content_processor import ContentProcessor  
 
+logger = logging.getLogger(__name__)
+
 # Create Blueprint
 webhook_bp = Blueprint('webhook', __name__, url_prefix='/webhook')
 
@@ -12,6 +17,17 @@ mailchimp_service = MailchimpService()
 wordpress_service = WordPressService()
 content_processor = ContentProcessor()
 
+# Bounded worker pool so a webhook retry storm can't spawn unbounded threads
+EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mc")
+
+# Campaign ids currently being processed, to drop duplicate deliveries
+_inflight = set()
+_inflight_lock = Lock()
+
+# Campaigns finished within the last hour, mapped to their WordPress post
+# id; late duplicate deliveries are answered from here without re-queueing
+_recently_processed = TTLCache(maxsize=1024, ttl=3600)
+
 @webhook_bp.route('/mailchimp', methods=['GET', 'POST', 'HEAD'])
 def mailchimp_webhook():
     """
@@ -19,17 +35,16 @@ def mailchimp_webhook():
     - GET/HEAD: Used by Mailchimp to validate the webhook
     - POST: Process the campaign and send to WordPress
     """
-    print(">>> MAILCHIMP WEBHOOK CALLED!")
-    print("Method is:", request.method)
-    
     # Handle GET/HEAD requests from Mailchimp validator
     if request.method in ['GET', 'HEAD']:
         return Response("OK", status=200, mimetype="text/plain")
     
-    # Debug incoming request
-    print("Content-Type:", request.headers.get('Content-Type'))
-    print("Form data:", request.form)
-    print("JSON data:", request.get_json(silent=True))
+    # Debug-only request dump; the guard keeps production runs from paying
+    # for body parsing and repr() just to build a discarded message
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Webhook %s, Content-Type: %s", request.method, request.headers.get('Content-Type'))
+        logger.debug("Form data: %s", request.form)
+        logger.debug("JSON data: %s", request.get_json(silent=True))
 
     try:
         # Extract campaign ID from request
@@ -37,20 +52,37 @@ def mailchimp_webhook():
         if not campaign_id:
             return jsonify({"error": "No campaign ID found"}), 400
 
-        thread = Thread(target=_process_campaign_async, args=(campaign_id,))
-        thread.daemon = True
-        thread.start()
+        # Drop duplicate deliveries for a campaign that is already queued
+        # or was fully processed recently
+        with _inflight_lock:
+            post_id = _recently_processed.get(campaign_id)
+            if post_id is not None:
+                logger.info("Campaign %s already processed, ignoring duplicate", campaign_id)
+                return jsonify({
+                    "status": "already_processed",
+                    "campaign_id": campaign_id,
+                    "post_id": post_id
+                }), 200
+            if campaign_id in _inflight:
+                logger.info("Campaign %s already in flight, ignoring duplicate", campaign_id)
+                return jsonify({"status": "duplicate", "campaign_id": campaign_id}), 200
+            _inflight.add(campaign_id)
         
-        print(f"Campaign {campaign_id} queued for processing")
-        return jsonify({"status": "queued", "campaign_id": campaign_id}), 200
+        EXECUTOR.submit(_process_campaign_async, campaign_id)
+        
+        logger.info("Campaign %s queued for processing", campaign_id)
+        return jsonify({"status": "queued", "campaign_id": campaign_id}), 202
         
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Error handling webhook: %s", e)
         return jsonify({"error": str(e)}), 500
 
 def _extract_campaign_id(request):
     """Extract campaign ID from either form data or JSON."""
-    if request.form:
+    # Branch on the declared content type so JSON bodies are never run
+    # through the urlencoded form parser (and vice versa)
+    mimetype = request.mimetype
+    if mimetype == 'application/x-www-form-urlencoded' or mimetype.startswith('multipart/'):
         return request.form.get('data[id]')
     else:
         data = request.get_json(silent=True) or {}
@@ -59,23 +91,26 @@ def _extract_campaign_id(request):
 def _process_campaign_async(campaign_id):
     """Process a Mailchimp campaign asynchronously."""
     try:
-        print(f"Starting async processing of campaign {campaign_id}")
+        logger.info("Starting async processing of campaign %s", campaign_id)
         
         # 1. Fetch campaign data from Mailchimp
         campaign_data = mailchimp_service.get_complete_campaign(campaign_id)
-        print(f"Campaign data fetched for {campaign_id}")
+        logger.info("Campaign data fetched for %s", campaign_id)
         
         # 2. Parse and structure the content
         structured_content = content_processor.parse_email_content(campaign_data)
-        print(f"Content processed for {campaign_id}. Found:")
-        print(f"- Text blocks: {len(structured_content.get('text_blocks', []))}")
-        print(f"- Images: {len(structured_content.get('images', []))}")
-        print(f"- CTA: {'Yes' if structured_content.get('call_to_action') else 'No'}")
-        print(f"- Links: {len(structured_content.get('embedded_links', []))}")
+        logger.info(
+            "Content processed for %s: %d text blocks, %d images, CTA: %s, %d links",
+            campaign_id,
+            len(structured_content.get('text_blocks', [])),
+            len(structured_content.get('images', [])),
+            'yes' if structured_content.get('call_to_action') else 'no',
+            len(structured_content.get('embedded_links', []))
+        )
         
         # 3. Process and upload images to WordPress
         uploaded_images = wordpress_service.process_and_upload_images(structured_content["images"])
-        print(f"Uploaded {len(uploaded_images)} images for campaign {campaign_id}")
+        logger.info("Uploaded %d images for campaign %s", len(uploaded_images), campaign_id)
         
         # 4. Create WordPress post with structured content
         wp_response = wordpress_service.create_post(
@@ -86,9 +121,14 @@ def _process_campaign_async(campaign_id):
             structured_content.get("embedded_links", [])
         )
         
-        print(f"Successfully processed campaign {campaign_id}")
-        print(f"WordPress post created: {wp_response.get('link', wp_response.get('id'))}")
-    except Exception as e:
-        import traceback
-        print(f"Error processing campaign {campaign_id}: {e}")
-        print(traceback.format_exc())
\ No newline at end of file
+        logger.info("Successfully processed campaign %s", campaign_id)
+        logger.info("WordPress post created: %s", wp_response.get('link', wp_response.get('id')))
+        
+        # Remember the result so duplicate deliveries skip the whole pipeline
+        with _inflight_lock:
+            _recently_processed[campaign_id] = wp_response.get('id')
+    except Exception:
+        logger.exception("Error processing campaign %s", campaign_id)
+    finally:
+        with _inflight_lock:
+            _inflight.discard(campaign_id)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 import os
 from flask import Flask
 from api.webhook_routes import webhook_bp
@@ -5,6 +6,9 @@ from config import validate_config, PORT
 
 def create_app():
     """Create and configure the Flask application."""
+    # Configure logging before anything logs; DEBUG enables request dumps
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    
     app = Flask(__name__)
     
     # Register blueprints
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 # Mailchimp configuration
 MAILCHIMP_API_KEY = os.environ.get('MAILCHIMP_API_KEY')
@@ -11,8 +12,14 @@ WORDPRESS_APP_PASSWORD = os.environ.get('WORDPRESS_APP_PASSWORD')
 # Server configuration
 PORT = int(os.environ.get('PORT', 5000))
 
+@lru_cache(maxsize=1)
 def validate_config():
-    """Validate that all required configuration is present."""
+    """
+    Validate that all required configuration is present.
+    
+    The config is process-wide constants, so the result is computed once
+    and cached for the services that call this per construction.
+    """
     if not MAILCHIMP_API_KEY or '-' not in MAILCHIMP_API_KEY:
         raise Exception("MAILCHIMP_API_KEY not set or invalid.")
     
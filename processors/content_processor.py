@@ -1,6 +1,107 @@
+import hashlib
+import re
+import threading
+from cachetools import LRUCache
 from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+# Parsed-result cache size; entries are keyed by a digest of the HTML
+PARSE_CACHE_SIZE = 32
+
+# Refuse to parse pathological payloads; tree build on anything this large
+# would pin a worker thread for seconds
+MAX_HTML_BYTES = 10_000_000
+
+# Tags collected for text-block extraction, in the single DOM walk
+TEXT_BLOCK_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol"}
+
+# Constant-time tag dispatch for the text-block loop
+HEADING_LEVEL = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+LIST_STYLE = {"ol": "ordered", "ul": "unordered"}
+
+# Container classes that mark text-content areas in Mailchimp templates
+CONTENT_CONTAINER_CLASSES = {
+    'mcnTextContent',           # Mailchimp text content block
+    'mcnTextContentContainer',  # Mailchimp text container
+    'contentContainer',         # Generic content container
+    'bodyContainer',            # Email body container
+    'contentBlock',             # Generic content block
+}
+
+# Precompiled keyword scans for the per-image UI filter: one C-level regex
+# search replaces a chain of Python-level substring tests per image
+UI_KEYWORD_RE = re.compile(
+    r"logo|footer|header|icon|social|facebook|twitter|instagram|linkedin|"
+    r"youtube|button|pixel|tracking|spacer|signature",
+    re.IGNORECASE
+)
+TRACKING_INDICATOR_RE = re.compile(
+    r"pixel|tracking|spacer|transparent\.gif|mailchimp\.com|list-manage\.com",
+    re.IGNORECASE
+)
+
+# Keyword/class constants for the image heuristics, hoisted so the per-image
+# classifiers stop rebuilding list literals on every call
+CONTENT_KEYWORDS = frozenset(['content', 'article', 'story', 'banner', 'hero', 'featured'])
+MAILCHIMP_CONTENT_CLASSES = frozenset(['mceImage', 'imageDropZone'])
+LOGO_KEYWORDS = ('logo', 'header', 'brand')
+HEADER_CLASSES = frozenset(['logo', 'header', 'brand', 'mceLogo'])
+HEADER_CONTAINERS = frozenset(['mceHeader', 'mceSectionHeader'])
+FOOTER_KEYWORDS = ('footer', 'social', 'facebook', 'twitter', 'instagram',
+                   'linkedin', 'youtube', 'contact', 'signature')
+FOOTER_CONTAINERS = frozenset(['mceFooter', 'mceSectionFooter', 'socialFollow'])
+
+# Substring keyword groups compiled into single alternation scans; operands
+# are the already-lowercased url/alt copies, so no flags are needed
+LOGO_KEYWORD_RE = re.compile("|".join(map(re.escape, LOGO_KEYWORDS)))
+FOOTER_KEYWORD_RE = re.compile("|".join(map(re.escape, FOOTER_KEYWORDS)))
+
+# Matches an integer dimension with an optional px suffix; anything else
+# ("auto", "100%") is treated as unknown
+DIMENSION_RE = re.compile(r"^\s*(\d+)\s*(?:px)?\s*$")
+
+# Link-classification patterns, compiled once like the image filters above
+UTILITY_LINK_PATTERNS = (
+    # Social media
+    'facebook.com', 'twitter.com', 'instagram.com', 'linkedin.com',
+    'youtube.com', 'pinterest.com', 'tiktok.com',
+    
+    # Mailchimp and email utility links
+    'mailchimp.com', 'list-manage.com', 'forward to a friend', 
+    'unsubscribe', 'preferences', 'view in browser',
+    
+    # Common site utility links
+    'privacy policy', 'terms', 'contact us', 'help', 'faq'
+)
+UTILITY_LINK_RE = re.compile("|".join(map(re.escape, UTILITY_LINK_PATTERNS)), re.IGNORECASE)
+
+TRACKING_DOMAINS = (
+    'doubleclick.net', 'google-analytics.com', 'mailchimp.com/track',
+    'list-manage.com/track', 'analytics', 'pixel', 'beacon'
+)
+TRACKING_DOMAIN_RE = re.compile("|".join(map(re.escape, TRACKING_DOMAINS)), re.IGNORECASE)
+
+CTA_PHRASES = ('learn more', 'read more', 'sign up', 'register', 'buy now', 
+               'get started', 'join', 'subscribe', 'download', 'shop', 
+               'view', 'click here', 'discover')
+CTA_PHRASE_RE = re.compile("|".join(map(re.escape, CTA_PHRASES)), re.IGNORECASE)
+
+# Substring hints used by the CTA/button classifiers, hoisted like the
+# keyword groups above (these scan short strings, so plain tuples suffice)
+BUTTON_STYLE_HINTS = ('padding', 'border-radius', 'background')
+BUTTON_LAYOUT_HINTS = ('block', 'inline-block', 'center')
+TD_BUTTON_STYLE_HINTS = ('padding', 'border-radius', 'background', 'center')
+CTA_CLASS_HINTS = ('cta', 'action', 'primary', 'main')
+BUTTON_CLASS_HINTS = ('button', 'btn', 'cta')
+BUTTON_STYLE_PROPS = ('padding:', 'background-color:', 'border-radius:')
+CENTER_HINTS = ('center', 'align', 'margin:auto')
 
 class ContentProcessor:
+    def __init__(self):
+        """Initialize the processor with a small cache of parsed results."""
+        self._parse_cache = LRUCache(maxsize=PARSE_CACHE_SIZE)
+        self._parse_cache_lock = threading.Lock()
+    
     def parse_email_content(self, campaign_data):
         """
         Parse Mailchimp email HTML content and structure it for WordPress.
@@ -13,86 +114,169 @@ class ContentProcessor:
         5. Extract content images using smart filtering logic
         6. Capture CTAs with improved detection logic
         7. Extract useful embedded links (excluding generic/tracking links)
+        
+        Parsing the same HTML twice (webhook retries, reprocessing) hits a
+        digest-keyed cache, so callers should treat the result as read-only.
         """
-        html = campaign_data.get("html", "")
-        soup = BeautifulSoup(html, "html.parser")
+        html = campaign_data.get("html") or ""
+        
+        # Cheap guards before any parsing work
+        if not html:
+            return {
+                "title": campaign_data.get("subject_line", ""),
+                "text_blocks": [],
+                "images": [],
+                "call_to_action": None,
+                "embedded_links": []
+            }
+        if len(html) > MAX_HTML_BYTES:
+            raise ValueError(f"Campaign HTML exceeds {MAX_HTML_BYTES} bytes")
+        
+        digest = hashlib.blake2b(html.encode(), digest_size=16).digest()
+        with self._parse_cache_lock:
+            parsed = self._parse_cache.get(digest)
+        
+        if parsed is None:
+            parsed = self._parse_html(html)
+            with self._parse_cache_lock:
+                self._parse_cache[digest] = parsed
+        
+        # Title comes from campaign details, not the HTML, so it stays
+        # outside the cached portion
+        return {
+            "title": campaign_data.get("subject_line", ""),
+            **parsed
+        }
+    
+    def _parse_html(self, html):
+        """Parse the email HTML and extract all structured content from it."""
+        # lxml's C parser builds the tree several times faster than html.parser
+        # on the large nested-table HTML Mailchimp produces
+        soup = BeautifulSoup(html, "lxml")
 
         structured = {
-            "title": campaign_data.get("subject_line", ""),
             "text_blocks": [],
             "images": [],
             "call_to_action": None,
             "embedded_links": []  # New feature for embedded links
         }
 
+        # Walk the tree once, collecting everything the extractors below need,
+        # instead of paying a full traversal per extractor
+        nodes = self._collect_nodes(soup)
+
+        # Anchors are examined by both the CTA and embedded-link extractors;
+        # memoize their subtree text for the duration of this parse
+        text_cache = {}
+
         # Extract text blocks (headings, paragraphs, lists)
-        structured["text_blocks"] = self._extract_text_blocks(soup)
+        structured["text_blocks"] = self._extract_text_blocks(nodes["text_nodes"])
         
         # Extract and filter images with smart logic
-        structured["images"] = self._extract_content_images(soup)
+        structured["images"] = self._extract_content_images(soup, nodes["images"], nodes["body_container"])
         
         # Extract call to action with improved detection
-        structured["call_to_action"] = self._extract_cta(soup)
+        structured["call_to_action"] = self._extract_cta(nodes["anchors"], text_cache)
         
         # Extract embedded user links (new feature)
-        structured["embedded_links"] = self._extract_embedded_links(soup)
+        structured["embedded_links"] = self._extract_embedded_links(soup, nodes["anchors"], text_cache)
 
         return structured
     
-    def _extract_text_blocks(self, soup):
-        """Extract and process text blocks from the HTML."""
-        # 1) Gather headings, paragraphs, and lists in DOM order
-        node_list = soup.find_all(["h1","h2","h3","h4","h5","h6","p","ul","ol"])
-        raw_blocks = []
+    def _collect_nodes(self, soup):
+        """
+        Collect text-block tags, images, anchors, and the body container in a
+        single pass over the parsed tree, preserving document order.
+        """
+        nodes = {
+            "text_nodes": [],
+            "images": [],
+            "anchors": [],
+            "body_container": None
+        }
+        
+        for el in soup.descendants:
+            if not isinstance(el, Tag):
+                continue
+            
+            name = el.name
+            if name in TEXT_BLOCK_TAGS:
+                nodes["text_nodes"].append(el)
+            elif name == "img":
+                nodes["images"].append(el)
+            elif name == "a":
+                nodes["anchors"].append(el)
+            elif name == "table" and nodes["body_container"] is None and el.get("id") == "bodyTable":
+                nodes["body_container"] = el
+        
+        if nodes["body_container"] is None:
+            nodes["body_container"] = soup
+        
+        return nodes
+    
+    def _extract_text_blocks(self, node_list):
+        """Extract and process text blocks from the collected nodes."""
+        # Merge consecutive paragraph blocks as they stream out of the
+        # generator, joining each run once so the text is copied linearly
+        # and no intermediate raw-block list is materialized
+        merged = []
+        paragraph_run = []
+        
+        def flush_paragraphs():
+            if paragraph_run:
+                merged.append({
+                    "type": "paragraph",
+                    "content": "\n\n".join(paragraph_run)
+                })
+                paragraph_run.clear()
+        
+        for block in self._iter_raw_blocks(node_list):
+            if block["type"] == "paragraph":
+                paragraph_run.append(block["content"])
+            else:
+                flush_paragraphs()
+                merged.append(block)
+        flush_paragraphs()
 
+        return merged
+    
+    def _iter_raw_blocks(self, node_list):
+        """Yield header/paragraph/list blocks from the nodes in DOM order."""
         for node in node_list:
             tag = node.name.lower()
-            if tag in ["h1","h2","h3","h4","h5","h6"]:
+            level = HEADING_LEVEL.get(tag)
+            if level:
                 text = node.get_text(strip=True)
                 if text:
-                    level = int(tag[-1])  # e.g. h2 -> level=2
-                    raw_blocks.append({
+                    yield {
                         "type": "header",
                         "level": level,
                         "content": text
-                    })
+                    }
             elif tag == "p":
                 text = node.get_text(strip=True)
                 if text:
-                    raw_blocks.append({
+                    yield {
                         "type": "paragraph",
                         "content": text
-                    })
-            elif tag in ["ul","ol"]:
-                # Build a single "list" block containing all <li>
+                    }
+            elif tag in LIST_STYLE:
+                # Build a single "list" block from the direct <li> children,
+                # filtered inline rather than via a find_all ResultSet
                 items = []
-                lis = node.find_all("li", recursive=False)
-                for li in lis:
-                    li_text = li.get_text(strip=True)
-                    if li_text:
-                        items.append(li_text)
+                for child in node.children:
+                    if getattr(child, "name", None) == "li":
+                        li_text = child.get_text(strip=True)
+                        if li_text:
+                            items.append(li_text)
                 if items:
-                    style = "ordered" if tag == "ol" else "unordered"
-                    raw_blocks.append({
+                    yield {
                         "type": "list",
-                        "style": style,
+                        "style": LIST_STYLE[tag],
                         "items": items
-                    })
-
-        # 2) Merge consecutive paragraph blocks
-        merged = []
-        for block in raw_blocks:
-            if block["type"] == "paragraph" and merged:
-                last = merged[-1]
-                if last["type"] == "paragraph":
-                    # Merge them with a blank line
-                    last["content"] += "\n\n" + block["content"]
-                    continue
-            merged.append(block)
-
-        return merged
+                    }
     
-    def _extract_content_images(self, soup):
+    def _extract_content_images(self, soup, all_images, body_container):
         """
         Extract content images with smart filtering.
         
@@ -103,15 +287,45 @@ class ContentProcessor:
         4. Keywords in URLs and alt text
         5. Context analysis (e.g., images inside content blocks)
         """
-        # First pass: Find all images and collect metadata about each
-        all_images = soup.select('img')
+        # Fast path: with at most two images there is no structural analysis
+        # to run — just drop clear UI elements, skipping the parent walks and
+        # document-order map entirely. (The <=2 branch below still guards
+        # the rare case where src-less images inflate the raw count.)
+        if len(all_images) <= 2:
+            content_images = []
+            for img in all_images:
+                attrs = img.attrs
+                src = attrs.get('src', '')
+                if not src:
+                    continue
+                
+                width = self._parse_dimension(attrs.get('width', ''))
+                height = self._parse_dimension(attrs.get('height', ''))
+                img_data = {
+                    'url': src,
+                    'alt': attrs.get('alt', ''),
+                    'is_small': bool(width and height and (width < 50 or height < 50))
+                }
+                if not self._is_likely_ui_element(img_data):
+                    content_images.append({'url': img_data['url'], 'alt': img_data['alt']})
+            return content_images
+        
+        # First pass: collect metadata about each image found in the DOM walk
         image_data = []
         
-        # Get email body container for position analysis
-        body_container = soup.select_one('table#bodyTable') or soup
+        # Map each element in the body container to its document-order index
+        # once, instead of re-walking the container for every image
+        dom_order = {id(el): i for i, el in enumerate(body_container.find_all())}
+        
+        # Images in the same table cell share ancestors; memoize each
+        # ancestor's class list so it is read from the tree only once
+        ancestor_class_cache = {}
         
         for i, img in enumerate(all_images):
-            src = img.get('src', '')
+            # Snapshot the attribute dict once; every field below reads from
+            # the plain dict instead of going through Tag attribute lookup
+            attrs = img.attrs
+            src = attrs.get('src', '')
             if not src:
                 continue
                 
@@ -122,23 +336,36 @@ class ContentProcessor:
             depth = 0
             
             while parent and depth < max_depth:
-                if parent.get('class'):
-                    parent_classes.extend(parent.get('class'))
+                parent_id = id(parent)
+                classes = ancestor_class_cache.get(parent_id)
+                if classes is None:
+                    classes = parent.get('class') or []
+                    ancestor_class_cache[parent_id] = classes
+                parent_classes.extend(classes)
                 parent = parent.parent
                 depth += 1
             
-            # Analyze the image
+            alt = attrs.get('alt', '')
+            classes = attrs.get('class') or []
+            
+            # Analyze the image; lowercased copies are made once here and
+            # reused by every keyword heuristic below
             img_data = {
                 'url': src,
-                'alt': img.get('alt', ''),
-                'width': self._parse_dimension(img.get('width', '')),
-                'height': self._parse_dimension(img.get('height', '')),
+                'alt': alt,
+                'url_lower': src.lower(),
+                'alt_lower': alt.lower(),
+                'width': self._parse_dimension(attrs.get('width', '')),
+                'height': self._parse_dimension(attrs.get('height', '')),
                 'position': i,  # Position in document order
                 'position_ratio': i / len(all_images) if len(all_images) > 0 else 0,  # Relative position (0-1)
-                'classes': img.get('class', []) if img.get('class') else [],
+                'classes': classes,
                 'parent_classes': parent_classes,
-                # Calculate approximate vertical position in the document
-                'y_position': self._estimate_vertical_position(img, body_container),
+                # Set copies for the O(1) intersection tests in the heuristics
+                'classes_set': set(classes),
+                'parent_classes_set': set(parent_classes),
+                # Approximate vertical position in the document
+                'y_position': dom_order.get(id(img), 0),
                 'is_small': False  # Will set below
             }
             
@@ -192,32 +419,17 @@ class ContentProcessor:
         """Parse dimension value (width/height) to integer if possible."""
         if not value:
             return None
-        try:
-            # Remove 'px' if present and convert to int
-            return int(value.replace('px', ''))
-        except (ValueError, TypeError):
-            return None
-
-    def _estimate_vertical_position(self, img, container):
-        """Estimate vertical position of an image in the document."""
-        # Get all elements in document order
-        all_elements = container.find_all()
-        if img in all_elements:
-            return all_elements.index(img)
-        return 0  # Default to top if not found
+        match = DIMENSION_RE.match(value)
+        return int(match.group(1)) if match else None
 
     def _is_likely_content_image(self, img_data):
         """Determine if an image is likely to be content based on multiple signals."""
-        # Keywords that suggest content images
-        content_keywords = ['content', 'article', 'story', 'banner', 'hero', 'featured']
-        
         # Check for content-related classes
-        has_content_class = any(cls in content_keywords for cls in img_data['classes'])
-        has_content_parent = any(cls in content_keywords for cls in img_data['parent_classes'])
+        has_content_class = not CONTENT_KEYWORDS.isdisjoint(img_data['classes_set'])
+        has_content_parent = not CONTENT_KEYWORDS.isdisjoint(img_data['parent_classes_set'])
         
         # Check for typical content image classes in Mailchimp
-        mailchimp_content_classes = ['mceImage', 'imageDropZone']
-        has_mc_content_class = any(cls in mailchimp_content_classes for cls in img_data['classes'])
+        has_mc_content_class = not MAILCHIMP_CONTENT_CLASSES.isdisjoint(img_data['classes_set'])
         
         # Size-based heuristic: content images tend to be larger
         is_large_enough = (img_data['width'] or 0) > 200 or (img_data['height'] or 0) > 200
@@ -231,80 +443,83 @@ class ContentProcessor:
 
     def _is_likely_ui_element(self, img_data):
         """Determine if an image is likely to be a UI element rather than content."""
-        # Keywords that suggest UI elements
-        ui_keywords = ['logo', 'footer', 'header', 'icon', 'social', 'facebook', 
-                      'twitter', 'instagram', 'linkedin', 'youtube', 'button',
-                      'pixel', 'tracking', 'spacer', 'signature']
+        # Signals are a plain OR, so test in the order that classifies the
+        # common cases soonest and bail early
         
-        # Check URL and alt text for UI keywords
-        has_ui_keyword_url = any(kw in img_data['url'].lower() for kw in ui_keywords)
-        has_ui_keyword_alt = any(kw in img_data['alt'].lower() for kw in ui_keywords)
-        
-        # Check for small dimensions (likely icons or UI elements)
-        is_small = img_data['is_small']
+        # Tracking pixels and hosted chrome first: most Mailchimp UI assets
+        # live on mailchimp.com/list-manage.com, so this one URL scan
+        # settles them immediately
+        if TRACKING_INDICATOR_RE.search(img_data['url']):
+            return True
         
-        # Check for tracking pixels and similar
-        tracking_indicators = ['pixel', 'tracking', 'spacer', 'transparent.gif', 
-                              'mailchimp.com', 'list-manage.com']
-        is_tracking = any(ind in img_data['url'].lower() for ind in tracking_indicators)
+        # Small dimensions (likely icons or UI elements): one flag check
+        if img_data['is_small']:
+            return True
         
-        # Combine signals
-        return has_ui_keyword_url or has_ui_keyword_alt or is_small or is_tracking
+        # UI keywords in URL or alt text (single case-insensitive scan; the
+        # space separator keeps keywords from matching across the boundary)
+        return UI_KEYWORD_RE.search(f"{img_data['url']} {img_data['alt']}") is not None
 
     def _is_likely_header(self, img_data):
         """Determine if an image is likely to be a header/logo."""
-        # Header images are typically at the top
-        at_top = img_data['position_ratio'] < 0.2
+        # Header images are typically at the top; everything else below is
+        # AND-ed with this, so bail before any string work
+        if img_data['position_ratio'] >= 0.2:
+            return False
         
         # Logo keywords
-        logo_keywords = ['logo', 'header', 'brand']
-        has_logo_keyword = (
-            any(kw in img_data['url'].lower() for kw in logo_keywords) or
-            any(kw in img_data['alt'].lower() for kw in logo_keywords)
+        has_logo_keyword = bool(
+            LOGO_KEYWORD_RE.search(img_data['url_lower']) or
+            LOGO_KEYWORD_RE.search(img_data['alt_lower'])
         )
         
         # Header images often have specific classes
-        header_classes = ['logo', 'header', 'brand', 'mceLogo']
-        has_header_class = any(cls in header_classes for cls in img_data['classes'])
+        has_header_class = not HEADER_CLASSES.isdisjoint(img_data['classes_set'])
         
         # Header containers
-        header_containers = ['mceHeader', 'mceSectionHeader']
-        in_header_container = any(cls in header_containers for cls in img_data['parent_classes'])
+        in_header_container = not HEADER_CONTAINERS.isdisjoint(img_data['parent_classes_set'])
         
         # Header images are often smaller than content images
         right_size_for_logo = ((img_data['width'] or 0) < 200) if img_data['width'] else False
         
         # Combine signals
-        return (at_top and (has_logo_keyword or has_header_class or 
-                           in_header_container or right_size_for_logo))
+        return (has_logo_keyword or has_header_class or 
+                in_header_container or right_size_for_logo)
 
     def _is_likely_footer(self, img_data):
         """Determine if an image is likely to be a footer element."""
-        # Footer images are typically at the bottom
-        at_bottom = img_data['position_ratio'] > 0.8
+        # Footer images are typically at the bottom; bail early otherwise,
+        # as with the header check
+        if img_data['position_ratio'] <= 0.8:
+            return False
         
         # Footer keywords
-        footer_keywords = ['footer', 'social', 'facebook', 'twitter', 'instagram',
-                          'linkedin', 'youtube', 'contact', 'signature']
-        has_footer_keyword = (
-            any(kw in img_data['url'].lower() for kw in footer_keywords) or
-            any(kw in img_data['alt'].lower() for kw in footer_keywords)
+        has_footer_keyword = bool(
+            FOOTER_KEYWORD_RE.search(img_data['url_lower']) or
+            FOOTER_KEYWORD_RE.search(img_data['alt_lower'])
         )
         
         # Footer containers
-        footer_containers = ['mceFooter', 'mceSectionFooter', 'socialFollow']
-        in_footer_container = any(cls in footer_containers for cls in img_data['parent_classes'])
+        in_footer_container = not FOOTER_CONTAINERS.isdisjoint(img_data['parent_classes_set'])
         
         # Footer images are often small (social icons, etc.)
         is_small = img_data['is_small']
         
         # Combine signals
-        return (at_bottom and (has_footer_keyword or in_footer_container or is_small))
+        return (has_footer_keyword or in_footer_container or is_small)
+    
+    def _node_text(self, node, cache):
+        """Stripped subtree text for a node, memoized per parse."""
+        text = cache.get(id(node))
+        if text is None:
+            text = node.get_text(strip=True)
+            cache[id(node)] = text
+        return text
     
-    def _extract_cta(self, soup):
+    def _extract_cta(self, anchors, text_cache):
         """
-        Extract call to action buttons from the HTML with improved detection.
-        Returns the primary CTA or the first CTA found.
+        Extract call to action buttons from the collected anchors with
+        improved detection. Returns the primary CTA or the first CTA found.
         """
         # Look for possible CTA elements with various button classes and attributes
         button_classes = [
@@ -317,37 +532,40 @@ class ContentProcessor:
             "mc-button"                 # Another Mailchimp variant
         ]
         
-        # Try class-based button selectors (combine with CSS OR selector)
-        class_selector = ", ".join(f"a.{cls}" for cls in button_classes)
-        class_buttons = soup.select(class_selector)
-        
-        # Try attribute and style-based button detection
+        # Classify each anchor in one pass: class-based detection first, then
+        # attribute/style-based detection for anchors without a button class.
+        # The lowered class/style strings are computed once here and carried
+        # through to the scoring step instead of being rebuilt there.
+        class_buttons = []
         attribute_buttons = []
         
-        # Look for elements with button-like styling
-        for a_tag in soup.find_all('a'):
-            # Skip if we already found it via class
-            if a_tag in class_buttons:
+        for a_tag in anchors:
+            cls_lower = ' '.join(a_tag.get('class', [])).lower()
+            style = a_tag.get('style', '').lower()
+            candidate = (a_tag, cls_lower, style)
+            
+            # Class-based button detection
+            if any(cls in button_classes for cls in a_tag.get('class', [])):
+                class_buttons.append(candidate)
                 continue
                 
             # Check for button-like styling in style attribute
-            style = a_tag.get('style', '').lower()
-            if any(s in style for s in ['padding', 'border-radius', 'background']):
-                if any(s in style for s in ['block', 'inline-block', 'center']):
-                    attribute_buttons.append(a_tag)
+            if any(s in style for s in BUTTON_STYLE_HINTS):
+                if any(s in style for s in BUTTON_LAYOUT_HINTS):
+                    attribute_buttons.append(candidate)
                     continue
             
             # Check for button-like parent elements
             parent = a_tag.parent
             if parent and parent.name == 'td':
                 parent_style = parent.get('style', '').lower()
-                if any(s in parent_style for s in ['padding', 'border-radius', 'background', 'center']):
-                    attribute_buttons.append(a_tag)
+                if any(s in parent_style for s in TD_BUTTON_STYLE_HINTS):
+                    attribute_buttons.append(candidate)
                     continue
             
             # Check for role attribute
             if a_tag.get('role') == 'button':
-                attribute_buttons.append(a_tag)
+                attribute_buttons.append(candidate)
                 continue
         
         # Combine all found buttons
@@ -358,8 +576,8 @@ class ContentProcessor:
             
         # Process all buttons to prioritize them
         button_data = []
-        for btn in all_buttons:
-            text = btn.get_text(strip=True)
+        for btn, cls_lower, style_lower in all_buttons:
+            text = self._node_text(btn, text_cache)
             url = btn.get("href", "")
             
             # Skip obvious non-CTA links (social, unsubscribe, etc.)
@@ -367,7 +585,7 @@ class ContentProcessor:
                 continue
                 
             # Calculate priority score
-            score = self._calculate_cta_priority(btn, text)
+            score = self._calculate_cta_priority(btn, text, cls_lower, style_lower)
             
             button_data.append({
                 "text": text,
@@ -385,22 +603,16 @@ class ContentProcessor:
             
         return None
 
-    def _calculate_cta_priority(self, button, text):
+    def _calculate_cta_priority(self, button, text, cls_lower, style_lower):
         """Calculate a priority score for a potential CTA button."""
         score = 0
         
         # Prioritize buttons with explicit CTA classes
-        cls = ' '.join(button.get('class', []))
-        if any(c in cls.lower() for c in ['cta', 'action', 'primary', 'main']):
+        if any(c in cls_lower for c in CTA_CLASS_HINTS):
             score += 10
         
         # Prioritize based on common CTA text patterns
-        cta_phrases = ['learn more', 'read more', 'sign up', 'register', 'buy now', 
-                       'get started', 'join', 'subscribe', 'download', 'shop', 
-                       'view', 'click here', 'discover']
-        
-        lower_text = text.lower()
-        if any(phrase in lower_text for phrase in cta_phrases):
+        if CTA_PHRASE_RE.search(text):
             score += 5
             
         # Prioritize standalone buttons with short text (typical for CTAs)
@@ -408,10 +620,9 @@ class ContentProcessor:
             score += 3
             
         # Check for visual prominence indicators
-        style = button.get('style', '').lower()
-        if 'bold' in style or 'weight' in style:
+        if 'bold' in style_lower or 'weight' in style_lower:
             score += 2
-        if any(color in style for color in ['background', 'bg', 'color']):
+        if any(color in style_lower for color in ('background', 'bg', 'color')):
             score += 2
             
         # Check parent for centering (centered buttons are often CTAs)
@@ -420,49 +631,23 @@ class ContentProcessor:
             parent_style = parent.get('style', '').lower()
             parent_class = ' '.join(parent.get('class', []))
             if any(align in parent_style or align in parent_class 
-                   for align in ['center', 'align', 'margin:auto']):
+                   for align in CENTER_HINTS):
                 score += 2
                 
         return score
     
     def _is_utility_link(self, text, url):
         """Check if a link is a utility link rather than a content link."""
-        utility_patterns = [
-            # Social media
-            'facebook.com', 'twitter.com', 'instagram.com', 'linkedin.com',
-            'youtube.com', 'pinterest.com', 'tiktok.com',
-            
-            # Mailchimp and email utility links
-            'mailchimp.com', 'list-manage.com', 'forward to a friend', 
-            'unsubscribe', 'preferences', 'view in browser',
-            
-            # Common site utility links
-            'privacy policy', 'terms', 'contact us', 'help', 'faq'
-        ]
-        
-        lower_text = text.lower()
-        lower_url = url.lower()
-        
-        return any(pattern in lower_text or pattern in lower_url 
-                  for pattern in utility_patterns)
+        return bool(UTILITY_LINK_RE.search(text) or UTILITY_LINK_RE.search(url))
     
-    def _extract_embedded_links(self, soup):
+    def _extract_embedded_links(self, soup, anchors, text_cache):
         """
         Extract embedded user links from the email content.
         Excludes utility links, tracking links, and other non-content links.
         """
-        # Find all links in content areas (typical for text content)
-        content_containers = [
-            'mcnTextContent',           # Mailchimp text content block
-            'mcnTextContentContainer',  # Mailchimp text container
-            'contentContainer',         # Generic content container
-            'bodyContainer',            # Email body container
-            'contentBlock',             # Generic content block
-        ]
-        
-        # Combined selector for content areas
-        content_selector = ", ".join(f".{cls}" for cls in content_containers)
-        content_areas = soup.select(content_selector)
+        # Find all links in content areas (typical for text content); a
+        # class filter on find_all avoids compiling a CSS selector per call
+        content_areas = soup.find_all(class_=CONTENT_CONTAINER_CLASSES.__contains__)
         
         # If we found content areas, look for links in them
         links_in_content = []
@@ -470,14 +655,14 @@ class ContentProcessor:
             for area in content_areas:
                 links_in_content.extend(area.find_all('a'))
         else:
-            # If we couldn't find content areas, take all links
-            # We'll filter them later
-            links_in_content = soup.find_all('a')
+            # If we couldn't find content areas, fall back to every anchor
+            # collected in the DOM walk; we'll filter them below
+            links_in_content = anchors
         
         # Process and filter the links
         user_links = []
         for link in links_in_content:
-            text = link.get_text(strip=True)
+            text = self._node_text(link, text_cache)
             url = link.get('href', '')
             
             # Skip empty links
@@ -502,17 +687,12 @@ class ContentProcessor:
                 "url": url
             })
         
-        # Remove duplicates (same URL)
-        unique_links = []
-        seen_urls = set()
-        
+        # Remove duplicates (same URL), keeping first occurrence in order
+        unique_links = {}
         for link in user_links:
-            url = link["url"]
-            if url not in seen_urls:
-                seen_urls.add(url)
-                unique_links.append(link)
+            unique_links.setdefault(link["url"], link)
         
-        return unique_links
+        return list(unique_links.values())
     
     def _is_tracking_or_anchor_link(self, url):
         """Check if a URL is a tracking link or internal anchor."""
@@ -525,24 +705,18 @@ class ContentProcessor:
             return True
             
         # Check for common tracking domains
-        tracking_domains = [
-            'doubleclick.net', 'google-analytics.com', 'mailchimp.com/track',
-            'list-manage.com/track', 'analytics', 'pixel', 'beacon'
-        ]
-        
-        lower_url = url.lower()
-        return any(domain in lower_url for domain in tracking_domains)
+        return TRACKING_DOMAIN_RE.search(url) is not None
     
     def _is_likely_button(self, link):
         """Check if a link is likely to be a button rather than a text link."""
         # Check classes for button indicators
         cls = ' '.join(link.get('class', []))
-        if any(btn in cls.lower() for btn in ['button', 'btn', 'cta']):
+        if any(btn in cls.lower() for btn in BUTTON_CLASS_HINTS):
             return True
             
         # Check style for button-like properties
         style = link.get('style', '').lower()
-        if any(prop in style for prop in ['padding:', 'background-color:', 'border-radius:']):
+        if any(prop in style for prop in BUTTON_STYLE_PROPS):
             return True
             
         # Check for role attribute
@@ -553,7 +727,7 @@ class ContentProcessor:
         parent = link.parent
         if parent:
             parent_cls = ' '.join(parent.get('class', []))
-            if any(btn in parent_cls.lower() for btn in ['button', 'btn', 'cta']):
+            if any(btn in parent_cls.lower() for btn in BUTTON_CLASS_HINTS):
                 return True
         
         return False
\ No newline at end of file
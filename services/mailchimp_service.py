@@ -1,6 +1,19 @@
 import base64
+import io
+import orjson
 import requests
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 import config
+from utils.http_utils import DEFAULT_TIMEOUT, HttpUtils
+
+# Cache recently fetched campaigns so Mailchimp's duplicate/retried webhook
+# deliveries don't pay the two API round trips again
+CAMPAIGN_CACHE_SIZE = 256
+CAMPAIGN_CACHE_TTL = 600  # seconds
 
 class MailchimpService:
     def __init__(self):
@@ -13,30 +26,168 @@ class MailchimpService:
         auth = base64.b64encode(f"anystring:{self.api_key}".encode()).decode()
         self.headers = {
             "Authorization": f"Basic {auth}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            # Explicitly request compressed responses; requests decompresses
+            "Accept-Encoding": "gzip, deflate, br"
         }
+        
+        # Pooled session so repeated API calls reuse one TLS connection
+        self.session = HttpUtils.build_session(headers=self.headers)
+        
+        # TTL cache plus in-flight tracking; webhook processing runs in
+        # background threads, so concurrent retries for the same campaign
+        # must share one fetch instead of stampeding the API
+        self._campaign_cache = TTLCache(maxsize=CAMPAIGN_CACHE_SIZE, ttl=CAMPAIGN_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+        self._inflight = {}
     
     def get_campaign_content(self, campaign_id):
-        """Fetch campaign content from Mailchimp API."""
+        """
+        Fetch campaign content from Mailchimp API.
+        
+        Only the html field is requested; the endpoint otherwise returns
+        plain_text, archive_html, and other variants we never read.
+        """
         content_url = f"https://{self.data_center}.api.mailchimp.com/3.0/campaigns/{campaign_id}/content"
         
-        content_res = requests.get(content_url, headers=self.headers)
+        content_res = self.session.get(content_url, params={"fields": "html"})
         content_res.raise_for_status()
-        return content_res.json()
+        return orjson.loads(content_res.content)
     
     def get_campaign_details(self, campaign_id):
-        """Fetch campaign details from Mailchimp API."""
+        """
+        Fetch campaign details from Mailchimp API.
+        
+        Only settings.subject_line is requested, which is all the pipeline
+        reads from the details object.
+        """
         details_url = f"https://{self.data_center}.api.mailchimp.com/3.0/campaigns/{campaign_id}"
         
-        details_res = requests.get(details_url, headers=self.headers)
+        details_res = self.session.get(details_url, params={"fields": "settings.subject_line"})
         details_res.raise_for_status()
-        return details_res.json()
+        return orjson.loads(details_res.content)
     
     def get_complete_campaign(self, campaign_id):
-        """Fetch both content and details, combining them into one object."""
-        content = self.get_campaign_content(campaign_id)
-        details = self.get_campaign_details(campaign_id)
+        """
+        Fetch both content and details, combining them into one object.
+        
+        Results are cached by campaign_id for CAMPAIGN_CACHE_TTL seconds, and
+        concurrent calls for the same campaign wait on the first fetch rather
+        than issuing their own.
+        """
+        while True:
+            with self._cache_lock:
+                cached = self._campaign_cache.get(campaign_id)
+                if cached is not None:
+                    return cached
+                
+                event = self._inflight.get(campaign_id)
+                if event is None:
+                    # We are the fetcher for this campaign
+                    self._inflight[campaign_id] = threading.Event()
+                    break
+            
+            # Another thread is already fetching; wait for it, then re-check
+            event.wait()
+        
+        try:
+            # The two GETs are independent, so run them in parallel; the
+            # session pool holds enough connections for both
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                content_future = executor.submit(self.get_campaign_content, campaign_id)
+                details_future = executor.submit(self.get_campaign_details, campaign_id)
+                content = content_future.result()
+                details = details_future.result()
+            
+            # Add subject line to content object
+            content['subject_line'] = details.get('settings', {}).get('subject_line', '')
+            
+            with self._cache_lock:
+                self._campaign_cache[campaign_id] = content
+            return content
+        finally:
+            # Wake any waiters; on failure they re-check and retry the fetch
+            with self._cache_lock:
+                event = self._inflight.pop(campaign_id)
+            event.set()
+    
+    def get_campaigns_batch(self, campaign_ids, poll_interval=2, timeout=300):
+        """
+        Fetch content and details for several campaigns with one server-side
+        batch call instead of 2*N individual GETs.
+        
+        Mailchimp runs the operations asynchronously, so this polls the
+        batch until it finishes and then unpacks the gzipped-tar result
+        archive it publishes.
+        
+        Args:
+            campaign_ids (list): Campaign ids to fetch
+            poll_interval (int): Seconds between batch status polls
+            timeout (int): Seconds to wait before giving up on the batch
+            
+        Returns:
+            dict: campaign_id -> combined content object, in the same shape
+                get_complete_campaign returns
+        """
+        base_url = f"https://{self.data_center}.api.mailchimp.com/3.0"
+        
+        operations = []
+        for cid in campaign_ids:
+            operations.append({
+                "method": "GET",
+                "path": f"/campaigns/{cid}/content",
+                "operation_id": f"content:{cid}",
+                "params": {"fields": "html"}
+            })
+            operations.append({
+                "method": "GET",
+                "path": f"/campaigns/{cid}",
+                "operation_id": f"details:{cid}",
+                "params": {"fields": "settings.subject_line"}
+            })
+        
+        batch_res = self.session.post(
+            f"{base_url}/batches",
+            data=orjson.dumps({"operations": operations})
+        )
+        batch_res.raise_for_status()
+        batch_id = orjson.loads(batch_res.content)["id"]
+        
+        # Poll until the batch finishes server-side
+        deadline = time.monotonic() + timeout
+        while True:
+            status_res = self.session.get(f"{base_url}/batches/{batch_id}")
+            status_res.raise_for_status()
+            status = orjson.loads(status_res.content)
+            if status.get("status") == "finished":
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Mailchimp batch {batch_id} did not finish within {timeout}s")
+            time.sleep(poll_interval)
+        
+        # Results arrive as a gzipped tar of JSON files on a presigned URL
+        # pointing outside the API host; fetch it without the session so the
+        # Basic-Auth header is neither leaked to that host nor rejected by
+        # S3's one-auth-mechanism rule
+        body_res = requests.get(status["response_body_url"], timeout=DEFAULT_TIMEOUT)
+        body_res.raise_for_status()
+        
+        results = {}
+        with tarfile.open(fileobj=io.BytesIO(body_res.content), mode="r:gz") as archive:
+            for member in archive.getmembers():
+                if not member.isfile() or not member.name.endswith(".json"):
+                    continue
+                for op in orjson.loads(archive.extractfile(member).read()):
+                    kind, _, cid = op.get("operation_id", "").partition(":")
+                    if cid and op.get("status_code") == 200:
+                        results.setdefault(cid, {})[kind] = orjson.loads(op["response"])
         
-        # Add subject line to content object
-        content['subject_line'] = details.get('settings', {}).get('subject_line', '')
-        return content
\ No newline at end of file
+        campaigns = {}
+        for cid, parts in results.items():
+            content = parts.get("content")
+            if content is None:
+                continue
+            details = parts.get("details", {})
+            content["subject_line"] = details.get("settings", {}).get("subject_line", "")
+            campaigns[cid] = content
+        return campaigns
@@ -1,9 +1,21 @@
 import base64
-import json
-import requests
+import logging
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from cachetools import LRUCache
+from requests_toolbelt import MultipartEncoder
 import config  
+from utils.http_utils import HttpUtils
 from utils.image_utils import ImageUtils  
 
+logger = logging.getLogger(__name__)
+
+# Concurrent media uploads per campaign. Kept below the session adapter's
+# pool_maxsize so every worker rides an already-open keep-alive connection
+# instead of opening (and TLS-handshaking) a new socket per image.
+MAX_UPLOAD_WORKERS = 8
+
 class WordPressService:
     def __init__(self):
         """Initialize the WordPress service with configuration."""
@@ -20,15 +32,37 @@ class WordPressService:
         self.auth_headers = {
             "Authorization": f"Basic {auth_b64}"
         }
+        
+        # Pooled session so media uploads and post creation reuse one TLS connection
+        self.session = HttpUtils.build_session(headers=self.auth_headers)
+        
+        # Media already uploaded this process, keyed by source URL; Mailchimp
+        # reuses the same logo/header assets across campaigns, so repeats
+        # skip both the download and the upload
+        self._upload_cache = LRUCache(maxsize=512)
+        self._upload_cache_lock = Lock()
+        
+        # Constant header dict for JSON posts (session supplies auth)
+        self._json_headers = {"Content-Type": "application/json"}
+        
+        # REST endpoints, formatted once instead of per call
+        self._media_endpoint = f"{self.wp_url}/wp-json/wp/v2/media"
+        self._posts_endpoint = f"{self.wp_url}/wp-json/wp/v2/posts"
     
-    def upload_to_media_library(self, image_binary, filename, alt_text):
+    def upload_to_media_library(self, image_file, filename, alt_text, content_type=None):
         """
         Upload image to WordPress Media Library.
         
+        The multipart body is streamed, so passing a file-like object (e.g.
+        from ImageUtils.open_image_stream) pipes bytes from the download
+        socket to the upload socket without buffering the whole image.
+        
         Args:
-            image_binary (bytes): The binary content of the image
+            image_file (bytes or file-like): The image content
             filename (str): Filename to use for the uploaded image
             alt_text (str): Alt text for the image
+            content_type (str, optional): MIME type declared by the source
+                server; falls back to guessing from the filename
             
         Returns:
             dict: WordPress media object with 'id' and 'source_url'
@@ -36,22 +70,26 @@ class WordPressService:
         Raises:
             requests.exceptions.RequestException: If the upload fails
         """
-        media_url = f"{self.wp_url}/wp-json/wp/v2/media"
+        media_url = self._media_endpoint
         
-        # Determine content type from filename
-        content_type = ImageUtils.get_content_type(filename)
+        # Trust the downloaded response's declared image type over the
+        # filename extension; guess only when the server said nothing useful
+        if not content_type or not content_type.startswith("image/"):
+            content_type = ImageUtils.get_content_type(filename)
         
-        files = {
-            'file': (filename, image_binary, content_type)
-        }
-        data = {
+        encoder = MultipartEncoder(fields={
+            'file': (filename, image_file, content_type),
             'title': filename,
             'alt_text': alt_text
-        }
+        })
 
-        resp = requests.post(media_url, headers=self.auth_headers, files=files, data=data)
+        resp = self.session.post(
+            media_url,
+            data=encoder,
+            headers={"Content-Type": encoder.content_type}
+        )
         resp.raise_for_status()
-        return resp.json()
+        return orjson.loads(resp.content)
     
     def create_post(self, title, text_blocks, images, call_to_action, embedded_links=None):
         """
@@ -70,64 +108,135 @@ class WordPressService:
         Raises:
             requests.exceptions.RequestException: If the post creation fails
         """
+        # Build the meta incrementally, encoding only populated fields with
+        # orjson's C encoder; empty campaigns then skip both the encode and
+        # the meta-key bytes on the wire
+        meta = {}
+        if text_blocks:
+            meta["newsletter_text_blocks"] = orjson.dumps(text_blocks).decode()
+        if images:
+            meta["newsletter_images"] = orjson.dumps(images).decode()
+        if call_to_action:
+            meta["newsletter_cta"] = orjson.dumps(call_to_action).decode()
+        if embedded_links:
+            meta["newsletter_embedded_links"] = orjson.dumps(embedded_links).decode()
+        
         post_data = {
             "title": title,
             "status": "draft",
             "content": "",  # empty
-            "meta": {
-                "newsletter_text_blocks": json.dumps(text_blocks),
-                "newsletter_images": json.dumps(images),
-                "newsletter_cta": json.dumps(call_to_action)
-            }
+            "meta": meta
         }
-        
-        # Add embedded links if provided
-        if embedded_links:
-            post_data["meta"]["newsletter_embedded_links"] = json.dumps(embedded_links)
 
-        # Create draft post
-        resp = requests.post(
-            f"{self.wp_url}/wp-json/wp/v2/posts",
-            headers={**self.auth_headers, "Content-Type": "application/json"},
-            json=post_data
+        # Create draft post, serializing the whole body with orjson as well
+        resp = self.session.post(
+            self._posts_endpoint,
+            data=orjson.dumps(post_data),
+            headers=self._json_headers
         )
         resp.raise_for_status()
-        return resp.json()
+        return orjson.loads(resp.content)
     
     def process_and_upload_images(self, image_data_list):
         """
         Process a list of image data, download each image and upload to WordPress.
         
+        Images are processed concurrently with a bounded thread pool since the
+        work is almost entirely waiting on sockets. Document order is preserved.
+        
         Args:
             image_data_list (list): List of image data with 'url' and 'alt' fields
             
         Returns:
             list: List of uploaded image data with 'media_id', 'url', and 'alt' fields
         """
-        uploaded_images = []
+        if not image_data_list:
+            return []
         
+        # Collapse duplicate URLs first; Mailchimp templates often repeat the
+        # same hero image across sections, and one upload can serve them all
+        unique_index = {}
+        unique_images = []
         for img in image_data_list:
-            remote_url = img["url"]
-            alt_text = img["alt"]
+            if img["url"] not in unique_index:
+                unique_index[img["url"]] = len(unique_images)
+                unique_images.append(img)
+        
+        # Threads share the pooled sessions, so concurrency is bounded by both
+        # max_workers here and pool_maxsize on the session adapters
+        worker_count = min(MAX_UPLOAD_WORKERS, len(unique_images))
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            unique_results = list(executor.map(self._download_and_upload_image, unique_images))
+        
+        # Fan results back out to the original positions, dropping failures
+        # (worker returns None on error)
+        results = (unique_results[unique_index[img["url"]]] for img in image_data_list)
+        return [result for result in results if result is not None]
+    
+    def _download_and_upload_image(self, img):
+        """Download a single image and upload it to WordPress; None on failure."""
+        remote_url = img["url"]
+        alt_text = img["alt"]
+        
+        # A cache hit with validators is revalidated with a conditional GET
+        # (CDN content can change under a stable URL); without validators
+        # the cached media item is reused outright
+        with self._upload_cache_lock:
+            cached = self._upload_cache.get(remote_url)
+        
+        validators = None
+        if cached is not None:
+            validators = {}
+            if cached.get("etag"):
+                validators["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                validators["If-Modified-Since"] = cached["last_modified"]
+            if not validators:
+                return {
+                    "media_id": cached["media_id"],
+                    "url": cached["url"],
+                    "alt": alt_text
+                }
+        
+        try:
+            # Open a streaming download so bytes flow straight into the upload
+            image_stream = ImageUtils.open_image_stream(remote_url, validators=validators)
+            
+            if image_stream is None:
+                # 304 Not Modified: the uploaded media still matches
+                return {
+                    "media_id": cached["media_id"],
+                    "url": cached["url"],
+                    "alt": alt_text
+                }
             
             try:
-                # Download the image
-                img_data = ImageUtils.download_image(remote_url)
-                
                 # Extract filename from URL
                 filename = ImageUtils.extract_filename(remote_url)
                 
-                # Upload to WordPress
-                media_item = self.upload_to_media_library(img_data, filename, alt_text)
-                
-                # Add to our list of uploaded images
-                uploaded_images.append({
-                    "media_id": media_item.get("id"),
-                    "url": media_item.get("source_url"),
-                    "alt": alt_text
-                })
-            except Exception as e:
-                print(f"Error processing image {remote_url}: {e}")
-                continue
-        
-        return uploaded_images
\ No newline at end of file
+                # Upload to WordPress, passing along the CDN-declared type
+                media_item = self.upload_to_media_library(
+                    image_stream, filename, alt_text,
+                    content_type=image_stream.content_type
+                )
+            finally:
+                image_stream.close()
+            
+            result = {
+                "media_id": media_item.get("id"),
+                "url": media_item.get("source_url"),
+                "alt": alt_text
+            }
+            
+            with self._upload_cache_lock:
+                self._upload_cache[remote_url] = {
+                    "media_id": result["media_id"],
+                    "url": result["url"],
+                    "etag": image_stream.etag,
+                    "last_modified": image_stream.last_modified
+                }
+            
+            return result
+        except Exception as e:
+            logger.warning("Error processing image %s: %s", remote_url, e)
+            return None
\ No newline at end of file
@@ -0,0 +1,53 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Applied to every request unless the caller overrides it; a stuck endpoint
+# must never pin a worker indefinitely
+DEFAULT_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+
+class TimeoutSession(requests.Session):
+    """Session that applies DEFAULT_TIMEOUT unless a call passes its own."""
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+class HttpUtils:
+    @staticmethod
+    def build_session(headers=None):
+        """
+        Build a requests.Session with keep-alive connection pooling and retries.
+
+        Reusing a session lets consecutive calls to the same host share one
+        TCP+TLS connection instead of paying a full handshake per request.
+
+        Args:
+            headers (dict, optional): Headers to set once on the session
+                (e.g. an Authorization header) so they apply to every call
+
+        Returns:
+            requests.Session: A session with pooling and retry configured
+        """
+        session = TimeoutSession()
+
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=retry
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        # Advertise brotli alongside gzip; urllib3 decompresses transparently
+        # with the brotli package installed
+        session.headers["Accept-Encoding"] = "gzip, deflate, br"
+
+        if headers:
+            session.headers.update(headers)
+
+        return session
@@ -1,24 +1,101 @@
-import requests
+import io
+import mimetypes
+import os
+from functools import lru_cache
+from urllib.parse import urlparse
+from utils.http_utils import HttpUtils
+
+# Shared pooled session so image downloads from the same CDN reuse connections
+_session = HttpUtils.build_session()
+
+class StreamedImage:
+    """
+    File-like wrapper around a streaming image download.
+
+    Exposes the length reported by Content-Length (multipart encoders need
+    it up front) while reading bytes straight off the download socket, so
+    the full image is never buffered in memory. The content type declared
+    by the server rides along for the uploader.
+
+    Note: requests_toolbelt treats `.len` as bytes *remaining*, not total
+    size — its upload loop reads until len reaches 0 — so read() must
+    decrement it or the encoder spins forever at EOF.
+    """
+    def __init__(self, response, length, content_type=""):
+        self._response = response
+        self._raw = response.raw
+        self.len = length
+        self.content_type = content_type
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    def read(self, amt=-1):
+        data = self._raw.read(amt)
+        if not data and self.len > 0:
+            # The origin closed short of its advertised Content-Length; the
+            # encoder would spin forever on empty reads, so fail the upload
+            # and let the worker's error path free the pool slot
+            raise IOError(f"short image body: {self.len} bytes missing")
+        self.len -= len(data)
+        return data
+
+    def close(self):
+        self._response.close()
+
+class BufferedImage(io.BytesIO):
+    """
+    Fully buffered fallback for downloads without a usable Content-Length,
+    carrying the declared content type like StreamedImage.
+    """
+    def __init__(self, data, content_type="", etag=None, last_modified=None):
+        super().__init__(data)
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
 
 class ImageUtils:
     @staticmethod
-    def download_image(image_url):
+    def open_image_stream(image_url, validators=None):
         """
-        Download remote image bytes.
-        
+        Open a streaming download so image bytes can be piped straight into
+        an upload without holding the whole file in memory.
+
         Args:
             image_url (str): URL of the image to download
-            
+            validators (dict, optional): Conditional request headers
+                (If-None-Match / If-Modified-Since); when the server answers
+                304 Not Modified, None is returned instead of a stream
+
         Returns:
-            bytes: The binary content of the image
-            
+            StreamedImage or BufferedImage: A file-like object with a known
+                length and the server-declared content_type. Falls back to
+                the fully buffered form when the server reports no usable
+                Content-Length.
+
         Raises:
             requests.exceptions.RequestException: If the download fails
         """
-        resp = requests.get(image_url)
+        resp = _session.get(image_url, stream=True, headers=validators or None)
+        if validators and resp.status_code == 304:
+            resp.close()
+            return None
         resp.raise_for_status()
-        return resp.content
-    
+
+        # The type the server declares wins over extension guessing — CDNs
+        # routinely serve webp for .jpg URLs via content negotiation
+        content_type = resp.headers.get("Content-Type", "").split(";")[0].strip()
+
+        length = resp.headers.get("Content-Length")
+        if length and "Content-Encoding" not in resp.headers:
+            return StreamedImage(resp, int(length), content_type)
+
+        # No usable length: buffer the body (reading it also frees the socket)
+        return BufferedImage(
+            resp.content, content_type,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified")
+        )
+
     @staticmethod
     def get_content_type(filename):
         """
@@ -30,28 +107,28 @@ class ImageUtils:
         Returns:
             str: The MIME type for the image
         """
-        if filename.lower().endswith(".png"):
-            return "image/png"
-        elif filename.lower().endswith(".gif"):
-            return "image/gif"
-        elif filename.lower().endswith(".webp"):
-            return "image/webp"
-        else:
-            # Default to JPEG
-            return "image/jpeg"
+        content_type, _ = mimetypes.guess_type(filename)
+        if content_type and content_type.startswith("image/"):
+            return content_type
+        # Default to JPEG for unknown or non-image extensions
+        return "image/jpeg"
     
     @staticmethod
+    @lru_cache(maxsize=1024)
     def extract_filename(url):
         """
         Extract a filename from an image URL.
         
+        Results are memoized — the same logo/footer URLs recur across
+        campaigns, so repeats skip the URL parse.
+        
         Args:
             url (str): The URL of the image
             
         Returns:
             str: A filename, with fallback to default if none found
         """
-        try:
-            return url.split("/")[-1] or "mailchimp-image.jpg"
-        except:
-            return "mailchimp-image.jpg"
\ No newline at end of file
+        # Parse the URL properly so query strings ("photo.jpg?w=800") and
+        # fragments never leak into the filename
+        path = urlparse(url).path
+        return os.path.basename(path) or "mailchimp-image.jpg"
\ No newline at end of file